@@ -2,6 +2,8 @@
 Shared configuration for API endpoints
 """
 
+import os
+
 # Default sender address (hardcoded for simplicity)
 DEFAULT_SENDER = {
     "name": "JunQ Trading Technology Inc.",
@@ -18,4 +20,4 @@ DEFAULT_SENDER = {
 PROVIDER_TIMEOUT = 8
 
 # Rate cache TTL (5 minutes)
-RATE_CACHE_TTL = 300
+RATE_CACHE_TTL = int(os.environ.get('RATE_CACHE_TTL', 300))
@@ -1,43 +1,72 @@
-from http.server import BaseHTTPRequestHandler
-import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+import mmap
+import orjson
 import os
-import traceback
-from datetime import datetime
+import sys
+import logging
+from urllib.parse import parse_qs, urlsplit
 
-# Simple JSON file storage for label history
-STORAGE_FILE = os.path.join(os.path.dirname(__file__), '..', 'storage', 'labels.json')
+# Add lib to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lib'))
 
+from api_handler import BaseHandler, now_iso
 
-class handler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        """Handle CORS preflight"""
-        self.send_response(200)
-        self._add_cors_headers()
-        self.end_headers()
+logger = logging.getLogger(__name__)
 
+# Append-only JSON Lines log of label history (oldest first, one record per line)
+STORAGE_FILE = os.path.join(os.path.dirname(__file__), '..', 'storage', 'labels.jsonl')
+
+# Earlier versions kept history as a single JSON array (newest first); it is
+# folded into the log the first time history is touched
+LEGACY_STORAGE_FILE = os.path.join(os.path.dirname(__file__), '..', 'storage', 'labels.json')
+
+# Only the most recent records are served; the log is compacted back down to
+# this many once it grows past MAX_LOG_BYTES
+MAX_RECORDS = 1000
+MAX_LOG_BYTES = 2 * 1024 * 1024
+
+
+def _created_at(record):
+    return record.get('created_at') or ''
+
+
+def _to_utc_iso(value):
+    """Rewrite a legacy created_at in now_iso()'s UTC format, leaving unparseable values alone"""
+    try:
+        stamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+
+    # Old records were stamped with naive server-local time; astimezone()
+    # treats a naive datetime as local
+    return stamp.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class handler(BaseHandler):
     def do_GET(self):
         """Get label history"""
         try:
             history = self._load_history()
 
             # Optional filtering by query params
-            query = self.path.split('?')[1] if '?' in self.path else ''
-            params = dict(item.split('=') for item in query.split('&') if '=' in item)
+            params = parse_qs(urlsplit(self.path).query)
+
+            # Filter by date range if provided. The log is in insertion order and
+            # records are stamped by the server on append, so created_at is
+            # ascending and the range can be found by binary search
+            lo, hi = 0, len(history)
 
-            # Filter by date range if provided
             if 'from_date' in params:
-                from_date = params['from_date']
-                history = [h for h in history if h.get('created_at', '') >= from_date]
+                from_date = params['from_date'][0]
+                lo = bisect_left(history, from_date, key=_created_at)
 
             if 'to_date' in params:
-                to_date = params['to_date']
-                history = [h for h in history if h.get('created_at', '') <= to_date]
+                to_date = params['to_date'][0]
+                hi = bisect_right(history, to_date, lo=lo, key=_created_at)
 
-            # Send response
-            self.send_response(200)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+            # Most recent first
+            history = history[lo:hi][::-1]
 
             response = {
                 'success': True,
@@ -45,30 +74,22 @@ class handler(BaseHTTPRequestHandler):
                 'count': len(history)
             }
 
-            self.wfile.write(json.dumps(response).encode())
+            # Send response
+            self._send_json(200, response)
 
         except Exception as e:
-            print(f"History GET error: {traceback.format_exc()}")
-            self.send_response(500)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-
+            logger.exception("History GET error")
             error_response = {
                 'success': False,
                 'error': str(e)
             }
-            self.wfile.write(json.dumps(error_response).encode())
+            self._send_json(500, error_response)
 
     def do_POST(self):
         """Add label to history"""
         try:
             # Parse request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = json.loads(self.rfile.read(content_length))
-
-            # Load existing history
-            history = self._load_history()
+            body = self._get_body()
 
             # Add new label record
             label_record = {
@@ -78,68 +99,139 @@ class handler(BaseHTTPRequestHandler):
                 'cost': body.get('cost'),
                 'currency': body.get('currency', 'USD'),
                 'provider': body.get('provider'),
-                'created_at': body.get('created_at', datetime.now().isoformat()),
+                # Stamped here so the log stays in created_at order for the
+                # date-range search; a client-sent created_at is ignored
+                'created_at': now_iso(),
                 'from_address': body.get('from_address'),
                 'to_address': body.get('to_address'),
                 'google_drive_link': body.get('google_drive_link'),
                 'google_drive_file_id': body.get('google_drive_file_id')
             }
 
-            # Add to beginning of list (most recent first)
-            history.insert(0, label_record)
-
-            # Keep only last 1000 records
-            history = history[:1000]
-
-            # Save history
-            self._save_history(history)
-
-            # Send response
-            self.send_response(200)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+            # Append to history log
+            self._append_history(label_record)
 
             response = {
                 'success': True,
                 'data': label_record
             }
 
-            self.wfile.write(json.dumps(response).encode())
+            # Send response
+            self._send_json(200, response)
 
         except Exception as e:
-            print(f"History POST error: {traceback.format_exc()}")
-            self.send_response(500)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-
+            logger.exception("History POST error")
             error_response = {
                 'success': False,
                 'error': str(e)
             }
-            self.wfile.write(json.dumps(error_response).encode())
-
-    def _add_cors_headers(self):
-        """Add CORS headers"""
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self._send_json(500, error_response)
 
     def _load_history(self):
-        """Load history from JSON file"""
+        """Load the most recent history records from the log, oldest first"""
+        self._migrate_legacy_history()
         try:
-            if os.path.exists(STORAGE_FILE):
-                with open(STORAGE_FILE, 'r') as f:
-                    return json.load(f)
+            return self._read_history()
         except Exception as e:
-            print(f"Error loading history: {e}")
+            logger.warning("Error loading history: %s", e)
+            return []
+
+    def _read_history(self):
+        """Read the most recent history records from the log, raising on I/O errors"""
+        history = []
+        if os.path.exists(STORAGE_FILE) and os.path.getsize(STORAGE_FILE) > 0:
+            with open(STORAGE_FILE, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                    memoryview(mm) as view:
+                # Walk lines backwards from the end of the log so only the
+                # records we serve are parsed, straight out of the mapping
+                end = len(mm)
+                while end > 0 and len(history) < MAX_RECORDS:
+                    start = mm.rfind(b'\n', 0, end - 1) + 1
+                    try:
+                        history.append(orjson.loads(view[start:end]))
+                    except orjson.JSONDecodeError:
+                        # Blank or torn line from an interrupted append
+                        pass
+                    end = start
+
+        history.reverse()
+        return history
+
+    def _append_history(self, label_record):
+        """Append one record to the history log, compacting it if it grew too large"""
+        os.makedirs(os.path.dirname(STORAGE_FILE), exist_ok=True)
+        self._migrate_legacy_history()
+
+        with open(STORAGE_FILE, 'ab') as f:
+            f.write(orjson.dumps(label_record) + b'\n')
+            log_size = f.tell()
+
+        if log_size > MAX_LOG_BYTES:
+            # Compacting from a failed read would wipe the log, so leave it
+            # oversized and try again on the next append
+            try:
+                history = self._read_history()
+            except Exception as e:
+                logger.warning("Skipping history compaction: %s", e)
+                return
+            self._save_history(history)
+
+    def _migrate_legacy_history(self):
+        """
+        Move records from the old labels.json array into the log, once
 
-        return []
+        Never raises: on failure the old file is put back so the next request
+        retries, and the existing log is still served.
+        """
+        if not os.path.exists(LEGACY_STORAGE_FILE):
+            return
+
+        # Claim the old file first so concurrent requests migrate it only once
+        claimed_file = f"{LEGACY_STORAGE_FILE}.{os.getpid()}.migrating"
+        try:
+            os.rename(LEGACY_STORAGE_FILE, claimed_file)
+        except FileNotFoundError:
+            # Another request claimed it first
+            return
+        except OSError as e:
+            logger.warning("Cannot migrate legacy history: %s", e)
+            return
+
+        try:
+            with open(claimed_file, 'rb') as f:
+                legacy = orjson.loads(f.read())
+
+            # Old records carry client-sent or server-local timestamps; put
+            # them in the log's UTC format and order so date ranges still
+            # bisect correctly once they are merged
+            legacy = [
+                {**record, 'created_at': _to_utc_iso(record['created_at'])}
+                if record.get('created_at') else record
+                for record in legacy
+            ]
+            history = sorted(legacy + self._read_history(), key=_created_at)
+            self._save_history(history)
+        except Exception as e:
+            logger.warning("Legacy history migration failed, will retry: %s", e)
+            try:
+                os.replace(claimed_file, LEGACY_STORAGE_FILE)
+            except OSError:
+                logger.exception("Legacy history left at %s", claimed_file)
+            return
+
+        # Only retire the old file once its records are safely in the log
+        os.replace(claimed_file, LEGACY_STORAGE_FILE + '.migrated')
 
     def _save_history(self, history):
-        """Save history to JSON file"""
+        """Rewrite the history log from a list of records (oldest first)"""
         os.makedirs(os.path.dirname(STORAGE_FILE), exist_ok=True)
 
-        with open(STORAGE_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
+        # Write a sibling file and swap it in so a crash mid-write can't leave
+        # a truncated log; no fsync, history is not worth the extra latency.
+        # The name is per process so concurrent compactions don't share it
+        tmp_file = f"{STORAGE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.writelines(orjson.dumps(record) + b'\n' for record in history)
+
+        os.replace(tmp_file, STORAGE_FILE)
@@ -1,40 +1,54 @@
-from http.server import BaseHTTPRequestHandler
-import json
 import os
 import sys
-import traceback
-import requests
-from datetime import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # Add lib to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lib'))
 
-from shippo_client import ShippoClient
-from easypost_client import EasyPostClient
-from shipengine_client import ShipEngineClient
-from easyship_client import EasyshipClient
-from google_drive_uploader import GoogleDriveUploader
+from api_handler import BaseHandler, now_iso
+from models import PurchaseRequest
+from provider_clients import (
+    get_shippo_client,
+    get_easypost_client,
+    get_shipengine_client,
+    get_easyship_client,
+)
+from google_drive_uploader import GoogleDriveUploader, download_pdf
+from http_session import SESSION
 
+logger = logging.getLogger(__name__)
 
-class handler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        """Handle CORS preflight"""
-        self.send_response(200)
-        self._add_cors_headers()
-        self.end_headers()
+# Runs label PDF downloads alongside Drive client setup
+_downloads = ThreadPoolExecutor(max_workers=2, thread_name_prefix='label-pdf')
 
+
+@lru_cache(maxsize=None)
+def _get_drive_uploader():
+    """Drive uploader, built once per warm container (credentials + API discovery)"""
+    return GoogleDriveUploader()
+
+
+def _close_download(future):
+    """Done-callback that closes the temp file of a PDF download nobody will read"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class handler(BaseHandler):
     def do_POST(self):
         """Purchase shipping label"""
         try:
             # Parse request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = json.loads(self.rfile.read(content_length))
+            request = self._get_model(PurchaseRequest)
 
-            rate_id = body.get('rate_id')
-            provider = body.get('provider')
-            label_format = body.get('format', os.environ.get('DEFAULT_LABEL_FORMAT', 'PDF'))
-            from_address = body.get('from_address', {})
-            to_address = body.get('to_address', {})
+            rate_id = request.rate_id
+            shipment_id = request.shipment_id
+            provider = request.provider
+            label_format = request.format or os.environ.get('DEFAULT_LABEL_FORMAT', 'PDF')
+            from_address = request.from_address
+            to_address = request.to_address
 
             if not rate_id or not provider:
                 raise ValueError("Missing rate_id or provider")
@@ -43,7 +57,7 @@ class handler(BaseHTTPRequestHandler):
             if provider == 'shippo':
                 label = self._purchase_shippo_label(rate_id, label_format)
             elif provider == 'easypost':
-                label = self._purchase_easypost_label(rate_id, label_format)
+                label = self._purchase_easypost_label(rate_id, label_format, shipment_id)
             elif provider == 'shipengine':
                 label = self._purchase_shipengine_label(rate_id, label_format)
             elif provider == 'easyship':
@@ -51,11 +65,6 @@ class handler(BaseHTTPRequestHandler):
             else:
                 raise ValueError(f"Unknown provider: {provider}")
 
-            # Download PDF from provider's temporary URL
-            pdf_response = requests.get(label.label_url, timeout=10)
-            pdf_response.raise_for_status()
-            pdf_content = pdf_response.content
-
             # Upload to Google Drive (if configured)
             drive_link = None
             drive_file_id = None
@@ -63,20 +72,32 @@ class handler(BaseHTTPRequestHandler):
 
             if os.environ.get('GOOGLE_SERVICE_ACCOUNT_JSON'):
                 try:
-                    uploader = GoogleDriveUploader()
-                    drive_result = uploader.upload_label(
-                        pdf_content=pdf_content,
-                        tracking_number=label.tracking_number,
-                        carrier=label.carrier,
-                        to_name=to_address.get('name', 'Unknown'),
-                        service_name=label.service
-                    )
+                    # Download PDF from provider's temporary URL in the
+                    # background while the Drive client is being set up (only
+                    # the first request in a container builds it)
+                    pdf_download = _downloads.submit(download_pdf, label.label_url, SESSION)
+                    try:
+                        uploader = _get_drive_uploader()
+                    except Exception:
+                        # Don't leak the spooled file if the download still lands
+                        if not pdf_download.cancel():
+                            pdf_download.add_done_callback(_close_download)
+                        raise
+
+                    with pdf_download.result() as pdf_file:
+                        drive_result = uploader.upload_label(
+                            pdf_content=pdf_file,
+                            tracking_number=label.tracking_number,
+                            carrier=label.carrier,
+                            to_name=to_address.get('name', 'Unknown'),
+                            service_name=label.service
+                        )
 
                     drive_link = drive_result['web_link']
                     drive_file_id = drive_result['file_id']
 
                 except Exception as drive_error:
-                    print(f"Google Drive upload failed: {traceback.format_exc()}")
+                    logger.exception("Google Drive upload failed")
                     drive_warning = f"Label purchased successfully, but Drive upload failed: {str(drive_error)}"
 
             # Prepare response
@@ -88,7 +109,7 @@ class handler(BaseHTTPRequestHandler):
                     'service': label.service,
                     'cost': float(label.cost),
                     'currency': getattr(label, 'currency', 'USD'),
-                    'created_at': label.created_at or datetime.now().isoformat(),
+                    'created_at': label.created_at or now_iso(),
                     'google_drive_link': drive_link,
                     'google_drive_file_id': drive_file_id,
                     'label_url_temp': label.label_url,  # Temporary URL (expires soon)
@@ -102,58 +123,32 @@ class handler(BaseHTTPRequestHandler):
                 response_data['warning'] = drive_warning
 
             # Send response
-            self.send_response(200)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-
-            self.wfile.write(json.dumps(response_data).encode())
+            self._send_json(200, response_data)
 
         except Exception as e:
-            print(f"Purchase error: {traceback.format_exc()}")
-            self.send_response(500)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-
+            logger.exception("Purchase error")
             error_response = {
                 'success': False,
                 'error': str(e)
             }
-            self.wfile.write(json.dumps(error_response).encode())
-
-    def _add_cors_headers(self):
-        """Add CORS headers"""
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self._send_json(500, error_response)
 
     def _purchase_shippo_label(self, rate_id, label_format):
         """Purchase label from Shippo"""
-        client = ShippoClient(
-            api_key=os.environ['SHIPPO_API_KEY'],
-            test_mode=os.environ.get('SHIPPO_TEST_MODE', 'true').lower() == 'true'
-        )
+        client = get_shippo_client()
         return client.purchase_label(rate_id, label_format)
 
-    def _purchase_easypost_label(self, rate_id, label_format):
+    def _purchase_easypost_label(self, rate_id, label_format, shipment_id=None):
         """Purchase label from EasyPost"""
-        client = EasyPostClient(
-            api_key=os.environ['EASYPOST_API_KEY'],
-            test_mode=os.environ.get('EASYPOST_TEST_MODE', 'true').lower() == 'true'
-        )
-        return client.purchase_label(rate_id, label_format)
+        client = get_easypost_client()
+        return client.purchase_label(rate_id, label_format, shipment_id=shipment_id)
 
     def _purchase_shipengine_label(self, rate_id, label_format):
         """Purchase label from ShipEngine"""
-        client = ShipEngineClient(
-            api_key=os.environ['SHIPENGINE_API_KEY']
-        )
+        client = get_shipengine_client()
         return client.purchase_label(rate_id, label_format)
 
     def _purchase_easyship_label(self, rate_id, label_format):
         """Purchase label from Easyship"""
-        client = EasyshipClient(
-            api_key=os.environ['EASYSHIP_API_KEY']
-        )
+        client = get_easyship_client()
         return client.purchase_label(rate_id, label_format)
@@ -1,96 +1,90 @@
-from http.server import BaseHTTPRequestHandler
-import json
+import atexit
+import hashlib
 import os
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
-import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+import logging
+from typing import List
+from pydantic import TypeAdapter
 
-# Add lib to path
+# Add lib and shared API config to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lib'))
-
-from models import Address, Parcel
-from shippo_client import ShippoClient
-from easypost_client import EasyPostClient
-from shipengine_client import ShipEngineClient
-from easyship_client import EasyshipClient
-
-
-class handler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        """Handle CORS preflight"""
-        self.send_response(200)
-        self._add_cors_headers()
-        self.end_headers()
-
+sys.path.append(os.path.dirname(__file__))
+
+from api_handler import BaseHandler
+from config import PROVIDER_TIMEOUT, RATE_CACHE_TTL
+from cache import TTLCache
+from models import RatesRequest, Rate
+from provider_clients import (
+    get_shippo_client,
+    get_easypost_client,
+    get_shipengine_client,
+    get_easyship_client,
+)
+
+logger = logging.getLogger(__name__)
+
+# Client getter per rate provider
+_PROVIDER_CLIENTS = {
+    'shippo': get_shippo_client,
+    'easypost': get_easypost_client,
+    'shipengine': get_shipengine_client,
+    'easyship': get_easyship_client,
+}
+
+# Providers with an API key configured, resolved once per container
+_PROVIDERS_ENABLED = tuple(
+    provider for provider in _PROVIDER_CLIENTS
+    if os.environ.get(f'{provider.upper()}_API_KEY')
+)
+
+# Worker threads for the provider fan-out, shared by every request this
+# container serves; sized for two requests' worth of slow providers
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='rates')
+atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+
+# Serializes a whole provider's rate list in one pydantic-core pass
+_RATE_LIST = TypeAdapter(List[Rate])
+
+# Quoted rates keyed by shipment and provider; kept short-lived because
+# carrier prices move
+_rate_cache = TTLCache(maxsize=1024, ttl=RATE_CACHE_TTL)
+
+# Providers whose rate IDs (and EasyPost shipment IDs) are single-use purchase
+# handles; their quotes are always fetched fresh so a repeat quote never hands
+# out a rate that has already been bought
+_UNCACHEABLE_PROVIDERS = frozenset({'shippo', 'easypost', 'shipengine'})
+
+
+class handler(BaseHandler):
     def do_POST(self):
         """Get shipping rates from all providers"""
         try:
             # Parse request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = json.loads(self.rfile.read(content_length))
+            request = self._get_model(RatesRequest)
 
-            # Validate and create models
-            from_address = Address(**body.get('from_address'))
-            to_address = Address(**body.get('to_address'))
-            parcel = Parcel(**body.get('parcel'))
-
-            # Get rates from all providers in parallel
+            # Serve repeat quotes for the same shipment from cache where the
+            # provider's rates can be bought more than once
+            cache_key = self._cache_key(request)
             results = {}
-            errors = {}
-
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                futures = {}
-
-                # Submit all provider requests
-                if os.environ.get('SHIPPO_API_KEY'):
-                    futures[executor.submit(
-                        self._get_shippo_rates,
-                        from_address,
-                        to_address,
-                        parcel
-                    )] = 'shippo'
-
-                if os.environ.get('EASYPOST_API_KEY'):
-                    futures[executor.submit(
-                        self._get_easypost_rates,
-                        from_address,
-                        to_address,
-                        parcel
-                    )] = 'easypost'
-
-                if os.environ.get('SHIPENGINE_API_KEY'):
-                    futures[executor.submit(
-                        self._get_shipengine_rates,
-                        from_address,
-                        to_address,
-                        parcel
-                    )] = 'shipengine'
-
-                if os.environ.get('EASYSHIP_API_KEY'):
-                    futures[executor.submit(
-                        self._get_easyship_rates,
-                        from_address,
-                        to_address,
-                        parcel
-                    )] = 'easyship'
-
-                # Collect results
-                for future in as_completed(futures, timeout=9):
-                    provider = futures[future]
-                    try:
-                        rates = future.result(timeout=8)
-                        results[provider] = rates
-                    except TimeoutError:
-                        errors[provider] = 'Request timed out'
-                    except Exception as e:
-                        errors[provider] = str(e)
-                        print(f"Error from {provider}: {traceback.format_exc()}")
-
-            # Send response
-            self.send_response(200)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+            for provider in _PROVIDERS_ENABLED:
+                cached = _rate_cache.get((cache_key, provider))
+                if cached is not None:
+                    results[provider] = cached
+
+            # Get rates from the remaining providers in parallel
+            fetched, errors = self._fetch_rates(
+                [p for p in _PROVIDERS_ENABLED if p not in results],
+                request.from_address,
+                request.to_address,
+                request.parcel
+            )
+            results.update(fetched)
+
+            # Failed providers have no entry, so an outage isn't remembered
+            for provider, rates in fetched.items():
+                if provider not in _UNCACHEABLE_PROVIDERS:
+                    _rate_cache.set((cache_key, provider), rates)
 
             response = {
                 'success': True,
@@ -98,77 +92,63 @@ class handler(BaseHTTPRequestHandler):
                 'errors': errors if errors else {}
             }
 
-            self.wfile.write(json.dumps(response).encode())
+            # Send response
+            self._send_json(200, response)
 
         except Exception as e:
-            print(f"Handler error: {traceback.format_exc()}")
-            self.send_response(500)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-
+            logger.exception("Handler error")
             error_response = {
                 'success': False,
                 'error': str(e)
             }
-            self.wfile.write(json.dumps(error_response).encode())
-
-    def _add_cors_headers(self):
-        """Add CORS headers"""
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-
-    def _get_shippo_rates(self, from_address, to_address, parcel):
-        """Get rates from Shippo"""
-        client = ShippoClient(
-            api_key=os.environ['SHIPPO_API_KEY'],
-            test_mode=os.environ.get('SHIPPO_TEST_MODE', 'true').lower() == 'true'
-        )
-        rates = client.get_rates(from_address, to_address, parcel)
-        return [self._serialize_rate(r) for r in rates]
-
-    def _get_easypost_rates(self, from_address, to_address, parcel):
-        """Get rates from EasyPost"""
-        client = EasyPostClient(
-            api_key=os.environ['EASYPOST_API_KEY'],
-            test_mode=os.environ.get('EASYPOST_TEST_MODE', 'true').lower() == 'true'
-        )
-        rates = client.get_rates(from_address, to_address, parcel)
-        return [self._serialize_rate(r) for r in rates]
-
-    def _get_shipengine_rates(self, from_address, to_address, parcel):
-        """Get rates from ShipEngine"""
-        client = ShipEngineClient(
-            api_key=os.environ['SHIPENGINE_API_KEY']
-        )
+            self._send_json(500, error_response)
+
+    def _cache_key(self, request):
+        """Hash a validated rates request into a cache key"""
+        # Validated models dump in field order with defaults filled in, so
+        # equivalent requests produce the same bytes
+        return hashlib.blake2b(
+            request.model_dump_json().encode(),
+            digest_size=16
+        ).digest()
+
+    def _fetch_rates(self, providers, from_address, to_address, parcel):
+        """Fan out to the given providers, returning (results, errors)"""
+        results = {}
+        errors = {}
+        futures = {}
+
+        # Submit all provider requests
+        for provider in providers:
+            futures[_executor.submit(
+                self._get_provider_rates,
+                provider,
+                from_address,
+                to_address,
+                parcel
+            )] = provider
+
+        # Wait for every provider, but no longer than the provider timeout;
+        # stragglers finish in the background and their results are dropped
+        done, not_done = wait(futures, timeout=PROVIDER_TIMEOUT)
+
+        # Collect results
+        for future in done:
+            provider = futures[future]
+            try:
+                results[provider] = future.result()
+            except Exception as e:
+                errors[provider] = str(e)
+                logger.exception("Error from %s", provider)
+
+        for future in not_done:
+            future.cancel()
+            errors[futures[future]] = 'Request timed out'
+
+        return results, errors
+
+    def _get_provider_rates(self, provider, from_address, to_address, parcel):
+        """Get rates from a single provider"""
+        client = _PROVIDER_CLIENTS[provider]()
         rates = client.get_rates(from_address, to_address, parcel)
-        return [self._serialize_rate(r) for r in rates]
-
-    def _get_easyship_rates(self, from_address, to_address, parcel):
-        """Get rates from Easyship"""
-        client = EasyshipClient(
-            api_key=os.environ['EASYSHIP_API_KEY']
-        )
-        rates = client.get_rates(from_address, to_address, parcel)
-        return [self._serialize_rate(r) for r in rates]
-
-    def _serialize_rate(self, rate):
-        """Convert Rate model to dict"""
-        if hasattr(rate, 'model_dump'):
-            return rate.model_dump()
-        elif hasattr(rate, 'dict'):
-            return rate.dict()
-        else:
-            return {
-                'object_id': rate.object_id,
-                'provider': rate.provider,
-                'carrier': getattr(rate, 'carrier', rate.provider),
-                'servicelevel_name': rate.servicelevel_name,
-                'servicelevel_token': getattr(rate, 'servicelevel_token', None),
-                'amount': float(rate.amount),
-                'currency': rate.currency,
-                'estimated_days': rate.estimated_days,
-                'duration_terms': getattr(rate, 'duration_terms', None),
-                'shipment_id': getattr(rate, 'shipment_id', None)
-            }
+        return _RATE_LIST.dump_python(rates)
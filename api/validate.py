@@ -1,34 +1,27 @@
-from http.server import BaseHTTPRequestHandler
-import json
 import os
 import sys
-import traceback
+import logging
 
 # Add lib to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lib'))
 
-from models import Address
-from shippo_client import ShippoClient
-from easypost_client import EasyPostClient
+from api_handler import BaseHandler
+from models import ValidateRequest
+from provider_clients import get_shippo_client, get_easypost_client
 
+logger = logging.getLogger(__name__)
 
-class handler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        """Handle CORS preflight"""
-        self.send_response(200)
-        self._add_cors_headers()
-        self.end_headers()
 
+class handler(BaseHandler):
     def do_POST(self):
         """Validate shipping address"""
         try:
             # Parse request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = json.loads(self.rfile.read(content_length))
+            request = self._get_model(ValidateRequest)
 
             # Get address and provider preference
-            address = Address(**body.get('address'))
-            provider = body.get('provider', 'auto')
+            address = request.address
+            provider = request.provider
 
             # Choose provider (default to Shippo, fallback to EasyPost)
             if provider == 'auto':
@@ -47,45 +40,26 @@ class handler(BaseHTTPRequestHandler):
             else:
                 raise ValueError(f"Unknown provider: {provider}")
 
-            # Send response
-            self.send_response(200)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-
             response = {
                 'success': True,
                 'data': result,
                 'provider': provider
             }
 
-            self.wfile.write(json.dumps(response).encode())
+            # Send response
+            self._send_json(200, response)
 
         except Exception as e:
-            print(f"Validation error: {traceback.format_exc()}")
-            self.send_response(500)
-            self._add_cors_headers()
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-
+            logger.exception("Validation error")
             error_response = {
                 'success': False,
                 'error': str(e)
             }
-            self.wfile.write(json.dumps(error_response).encode())
-
-    def _add_cors_headers(self):
-        """Add CORS headers"""
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self._send_json(500, error_response)
 
     def _validate_with_shippo(self, address):
         """Validate with Shippo"""
-        client = ShippoClient(
-            api_key=os.environ['SHIPPO_API_KEY'],
-            test_mode=os.environ.get('SHIPPO_TEST_MODE', 'true').lower() == 'true'
-        )
+        client = get_shippo_client()
 
         validation_result = client.validate_address(address)
 
@@ -93,15 +67,12 @@ class handler(BaseHTTPRequestHandler):
             'is_valid': validation_result.is_valid,
             'messages': validation_result.messages,
             'original': self._serialize_address(validation_result.original_address),
-            'suggested': self._serialize_address(validation_result.validated_address) if validation_result.validated_address else None
+            'suggested': self._serialize_address(validation_result.validated_address)
         }
 
     def _validate_with_easypost(self, address):
         """Validate with EasyPost"""
-        client = EasyPostClient(
-            api_key=os.environ['EASYPOST_API_KEY'],
-            test_mode=os.environ.get('EASYPOST_TEST_MODE', 'true').lower() == 'true'
-        )
+        client = get_easypost_client()
 
         validation_result = client.validate_address(address)
 
@@ -109,7 +80,7 @@ class handler(BaseHTTPRequestHandler):
             'is_valid': validation_result.is_valid,
             'messages': validation_result.messages,
             'original': self._serialize_address(validation_result.original_address),
-            'suggested': self._serialize_address(validation_result.validated_address) if validation_result.validated_address else None
+            'suggested': self._serialize_address(validation_result.validated_address)
         }
 
     def _serialize_address(self, address):
@@ -117,19 +88,4 @@ class handler(BaseHTTPRequestHandler):
         if address is None:
             return None
 
-        if hasattr(address, 'model_dump'):
-            return address.model_dump()
-        elif hasattr(address, 'dict'):
-            return address.dict()
-        else:
-            return {
-                'name': address.name,
-                'street1': address.street1,
-                'street2': getattr(address, 'street2', None),
-                'city': address.city,
-                'state': address.state,
-                'zip': address.zip,
-                'country': address.country,
-                'phone': getattr(address, 'phone', None),
-                'email': getattr(address, 'email', None)
-            }
+        return address.model_dump()
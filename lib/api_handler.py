@@ -0,0 +1,83 @@
+"""Shared base class for the API endpoint handlers"""
+
+from http.server import BaseHTTPRequestHandler
+import time
+import orjson
+
+# CORS headers sent with every response, encoded once at import
+_CORS_HEADER_BYTES = (
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+    b"Access-Control-Allow-Headers: Content-Type\r\n"
+)
+
+# Complete CORS preflight response, identical for every endpoint. The status
+# line matches BaseHTTPRequestHandler's default protocol_version
+_OPTIONS_RESPONSE = (
+    b"HTTP/1.0 200 OK\r\n"
+    + _CORS_HEADER_BYTES
+    + b"Content-Length: 0\r\n"
+    b"\r\n"
+)
+
+
+def now_iso():
+    """Current UTC time as an ISO 8601 string, without building a datetime"""
+    seconds, nanos = divmod(time.time_ns(), 1_000_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}.{nanos // 1000:06d}Z"
+
+
+class BaseHandler(BaseHTTPRequestHandler):
+    """BaseHTTPRequestHandler with helpers shared by every endpoint"""
+
+    # Buffer the socket writer so the status line, headers and JSON body go
+    # out together when the request finishes instead of as separate writes
+    wbufsize = -1
+
+    def parse_request(self):
+        # A keep-alive connection reuses this instance, so forget the
+        # previous request's body before handling the next one
+        self.__dict__.pop('_raw_body', None)
+        self.__dict__.pop('_body', None)
+        return super().parse_request()
+
+    def do_OPTIONS(self):
+        """Handle CORS preflight"""
+        self.wfile.write(_OPTIONS_RESPONSE)
+
+    def end_headers(self):
+        # Add the CORS headers straight to the pending header block rather
+        # than formatting them through send_header() on every response
+        if hasattr(self, '_headers_buffer'):
+            self._headers_buffer.append(_CORS_HEADER_BYTES)
+        super().end_headers()
+
+    def _read_body(self):
+        """Raw request body bytes, read from the socket only once"""
+        if '_raw_body' not in self.__dict__:
+            content_length = int(self.headers.get('Content-Length', 0))
+            self._raw_body = self.rfile.read(content_length)
+
+        return self._raw_body
+
+    def _get_body(self):
+        """Parse the JSON request body into plain Python objects, once"""
+        if '_body' not in self.__dict__:
+            self._body = orjson.loads(self._read_body())
+
+        return self._body
+
+    def _get_model(self, model):
+        """Parse and validate the JSON request body as a pydantic model in one pass"""
+        return model.model_validate_json(self._read_body())
+
+    def _send_json(self, status, payload):
+        """Send payload as a JSON response with the given status code"""
+        body = orjson.dumps(payload)
+
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        self.wfile.write(body)
@@ -0,0 +1,86 @@
+"""Small in-process TTL cache"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Bounded mapping whose entries expire a fixed time after being stored
+
+    Oldest entries are evicted first once maxsize is reached. Safe to share
+    between threads.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Seconds an entry stays valid after it is stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the oldest entries if full"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+
+
+# How long a validation result is reused for the same location (seconds)
+VALIDATION_CACHE_TTL = 24 * 60 * 60
+
+
+class ValidationCache:
+    """
+    Address validation results keyed by Address.normalized_key()
+
+    Repeat senders and recipients aren't verified again on every order. A hit
+    is returned as a copy carrying the caller's contact details.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = VALIDATION_CACHE_TTL):
+        """
+        Args:
+            maxsize: Maximum number of locations kept
+            ttl: Seconds a result stays valid after it is stored
+        """
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, address: Any) -> Any:
+        """Return the cached ValidationResult for address, or None"""
+        cached = self._cache.get(address.normalized_key())
+        if cached is None:
+            return None
+        return cached.for_address(address)
+
+    def set(self, address: Any, result: Any) -> None:
+        """Store the ValidationResult for address's location"""
+        self._cache.set(address.normalized_key(), result)
@@ -1,13 +1,21 @@
 """EasyPost API client wrapper"""
 
-import easypost
-from typing import Dict, List, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import attrgetter
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
 import logging
 from .models import Address, Parcel, Rate, ShippingLabel, ValidationResult
 from .config import config
+from .cache import ValidationCache
 
 logger = logging.getLogger(__name__)
 
+# Pulls the fields get_rates() needs from an EasyPost rate in one call
+_RATE_FIELDS = attrgetter('id', 'carrier', 'service', 'rate', 'currency', 'delivery_days')
+
 class EasyPostClient:
     """Wrapper around EasyPost API"""
 
@@ -25,14 +33,39 @@ class EasyPostClient:
         if not self.api_key:
             raise ValueError("EasyPost API key not configured. Set EASYPOST_API_KEY in .env file")
 
-        # Initialize EasyPost client with API key
+        # Initialize EasyPost client with API key. The SDK is imported here so
+        # importing this module stays cheap when EasyPost isn't configured
+        import easypost
         self.client = easypost.EasyPostClient(self.api_key)
 
+        # The SDK's session has the default 10-connection pool; widen it so
+        # concurrent calls from the pool below don't open throwaway connections
+        sdk_session = getattr(self.client, "_requests_session", None)
+        if sdk_session is not None:
+            sdk_session.mount(
+                self.client.api_base.rsplit("/", 1)[0],
+                HTTPAdapter(pool_maxsize=16, max_retries=3)
+            )
+
+        # Worker threads for the async API, so blocking SDK calls stay off
+        # the event loop
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="easypost")
+
+        # Validation results by location, reused for a day
+        self._validation_cache = ValidationCache(maxsize=1024)
+
         mode = "TEST" if self.test_mode else "LIVE"
         logger.info(f"Initialized EasyPost client in {mode} mode")
 
-    def _address_to_dict(self, address: Address) -> dict:
-        """Convert Address model to dict for EasyPost API"""
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _address_to_dict(address: Address) -> dict:
+        """
+        Convert Address model to dict for EasyPost API
+
+        Memoized per address; validate_address() copies it before adding
+        the "verify" flag.
+        """
         return {
             "name": address.name,
             "street1": address.street1,
@@ -45,8 +78,10 @@ class EasyPostClient:
             "email": address.email,
         }
 
-    def _parcel_to_dict(self, parcel: Parcel) -> dict:
-        """Convert Parcel model to dict for EasyPost API"""
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _parcel_to_dict(parcel: Parcel) -> dict:
+        """Convert Parcel model to dict for EasyPost API (cached, don't modify)"""
         return {
             "length": parcel.length,
             "width": parcel.width,
@@ -82,41 +117,64 @@ class EasyPostClient:
 
         shipment = self.client.shipment.create(**shipment_data)
 
-        # Convert to Rate models
-        rates = []
-        for rate_data in shipment.rates:
-            rate = Rate(
-                object_id=rate_data.id,
-                provider=rate_data.carrier,
-                servicelevel_name=rate_data.service,
-                servicelevel_token=rate_data.service,
-                amount=float(rate_data.rate),
-                currency=rate_data.currency,
-                estimated_days=rate_data.delivery_days,
+        # Convert to Rate models. EasyPost always returns the rate ID, carrier,
+        # service and currency as strings and delivery days as an int or null,
+        # so only the amount needs converting and validation can be skipped
+        shipment_id = shipment.id  # Store for later label purchase
+        rates = [
+            Rate.model_construct(
+                object_id=rate_id,
+                provider=carrier,
+                servicelevel_name=service,
+                servicelevel_token=service,
+                amount=float(amount),
+                currency=currency,
+                estimated_days=delivery_days,
                 duration_terms=None,
-                shipment_id=shipment.id,  # Store for later label purchase
+                shipment_id=shipment_id,
             )
-            rates.append(rate)
+            for rate_id, carrier, service, amount, currency, delivery_days
+            in map(_RATE_FIELDS, shipment.rates)
+        ]
 
         logger.info(f"Retrieved {len(rates)} rates")
         return rates
 
-    def purchase_label(self, rate_id: str, label_format: str = "PDF") -> ShippingLabel:
+    async def get_rates_async(self, from_address: Address, to_address: Address,
+                              parcel: Parcel) -> List[Rate]:
+        """
+        Awaitable get_rates() for rate_shopping.gather_rates
+
+        Runs on this client's own pool, so slow EasyPost calls can't use up
+        the event loop's default executor.
+        """
+        return await asyncio.wrap_future(
+            self._pool.submit(self.get_rates, from_address, to_address, parcel)
+        )
+
+    def purchase_label(self, rate_id: str, label_format: str = "PDF",
+                       shipment_id: Optional[str] = None) -> ShippingLabel:
         """
         Purchase shipping label
 
         Args:
             rate_id: Rate object ID from get_rates()
             label_format: PDF, PNG, or ZPL
+            shipment_id: Rate.shipment_id from get_rates(); saves an API call
+                to look it up from the rate
 
         Returns:
             ShippingLabel with tracking number and label URL
         """
         logger.info(f"Purchasing label with rate ID: {rate_id}")
 
-        # Retrieve the rate to get its shipment_id
-        rate = self.client.rate.retrieve(rate_id)
-        shipment_id = rate.shipment_id
+        if shipment_id:
+            # Buying only needs the rate's ID
+            rate = {"id": rate_id}
+        else:
+            # Retrieve the rate to get its shipment_id
+            rate = self.client.rate.retrieve(rate_id)
+            shipment_id = rate.shipment_id
 
         # Buy the shipment with the selected rate
         bought_shipment = self.client.shipment.buy(
@@ -150,10 +208,13 @@ class EasyPostClient:
         Returns:
             ValidationResult with validation status and corrected address
         """
+        cached = self._validation_cache.get(address)
+        if cached is not None:
+            return cached
+
         logger.info(f"Validating address in {address.city}, {address.state}")
 
-        address_data = self._address_to_dict(address)
-        address_data["verify"] = True
+        address_data = {**self._address_to_dict(address), "verify": True}
 
         try:
             validated = self.client.address.create_and_verify(**address_data)
@@ -176,8 +237,8 @@ class EasyPostClient:
             )
 
             if is_valid or validated:
-                # Create validated address from response
-                result.validated_address = Address(
+                # Create validated address from response (results are frozen, so on a copy)
+                result = result.model_copy(update={"validated_address": Address(
                     name=address.name,
                     street1=validated.street1,
                     street2=validated.street2 or "",
@@ -188,11 +249,14 @@ class EasyPostClient:
                     phone=address.phone,
                     email=address.email,
                     is_residential=getattr(validated, 'residential', True),
-                )
+                )})
                 logger.info("Address validated successfully")
             else:
                 logger.warning(f"Address validation failed: {result.messages}")
 
+            # Only cache answers from EasyPost, not request errors
+            self._validation_cache.set(address, result)
+
         except Exception as e:
             logger.error(f"Address validation error: {str(e)}")
             result = ValidationResult(
@@ -236,3 +300,41 @@ class EasyPostClient:
             "location": f"{latest_detail.tracking_location.city}, {latest_detail.tracking_location.state}" if latest_detail and latest_detail.tracking_location else "",
             "eta": tracker.est_delivery_date,
         }
+
+    def track_shipments(self, shipments: List[Tuple[str, str]]) -> List[dict]:
+        """
+        Track several shipments at once
+
+        Tracker lookups run on a thread pool, so polling N shipments costs about
+        one round trip instead of N.
+
+        Args:
+            shipments: (carrier, tracking_number) pairs
+
+        Returns:
+            Tracking information for each pair, in the same order. A lookup that
+            fails gives status "error" and the error message instead of raising
+        """
+        if not shipments:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(16, len(shipments))) as executor:
+            futures = [
+                executor.submit(self.track_shipment, carrier, tracking_number)
+                for carrier, tracking_number in shipments
+            ]
+
+        results = []
+        for (carrier, tracking_number), future in zip(shipments, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Tracking error for {tracking_number}: {str(e)}")
+                results.append({
+                    "carrier": carrier.upper(),
+                    "tracking_number": tracking_number,
+                    "status": "error",
+                    "error": str(e),
+                })
+
+        return results
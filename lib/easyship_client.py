@@ -1,18 +1,61 @@
 """Easyship API client wrapper using REST API"""
 
+import asyncio
 import os
+import time
+from functools import lru_cache
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Optional
 import logging
 from .models import Address, Parcel, Rate
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=1024)
+def _courier_from_service(service_name: str) -> str:
+    """
+    Carrier name from a rate description such as "USPS - Priority Mail"
+
+    Cached because the same few service descriptions come back on every
+    rate lookup.
+    """
+    # Try "USPS - " pattern first
+    if " - " in service_name:
+        return service_name.split(" - ", 1)[0].strip()
+    # Try "FedEx" pattern
+    if service_name.startswith("FedEx"):
+        return "FedEx"
+    return "Unknown"
+
+
 class EasyshipClient:
     """Wrapper around Easyship REST API"""
 
     BASE_URL = "https://public-api.easyship.com/2024-09"
 
+    # Back-off after a 429 that carries no usable Retry-After header (seconds)
+    DEFAULT_RATE_LIMIT_PAUSE = 30.0
+
+    # Parts of the rates request that are the same for every shipment
+    RATE_REQUEST_DEFAULTS = {
+        "incoterms": "DDU",
+        "insurance": {
+            "is_insured": False
+        }
+    }
+    RATE_ITEM_DEFAULTS = {
+        "category": "general",
+        "declared_currency": "USD",
+        "declared_customs_value": 50.0,
+        "description": "Package",
+        "quantity": 1,
+        "hs_code": "9999.99.99"  # Generic HS code for unspecified goods
+    }
+
     def __init__(self, api_key: Optional[str] = None):
         """
         Initialize Easyship client
@@ -30,10 +73,47 @@ class EasyshipClient:
             "Content-Type": "application/json"
         }
 
+        # Persistent session so repeat rate lookups reuse the TLS connection.
+        # Rate quotes are read-only, so POSTs are safe to retry, except after
+        # a read timeout, which has already used up the request's time budget
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=50,
+            max_retries=Retry(
+                total=3,
+                read=0,
+                backoff_factor=0.5,
+                # 429 is left to get_rates' back-off: sleeping out a long
+                # Retry-After here would blow the serverless time budget
+                status_forcelist=[502, 503, 504],
+                allowed_methods=["GET", "POST"],
+                raise_on_status=False,
+            ),
+        ))
+
+        # Monotonic time before which calls fail fast after a 429
+        self._rate_limited_until = 0.0
+
         logger.info("Initialized Easyship client")
 
-    def _address_to_dict(self, address: Address) -> dict:
-        """Convert Address model to dict for Easyship API"""
+    def _retry_after_seconds(self, response) -> float:
+        """Seconds to back off after a 429, from Retry-After when it is numeric"""
+        try:
+            return max(float(response.headers.get("Retry-After", "")), 1.0)
+        except ValueError:
+            return self.DEFAULT_RATE_LIMIT_PAUSE
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _address_to_dict(address: Address) -> dict:
+        """
+        Convert Address model to dict for Easyship API
+
+        The sender is the same on every quote, so results are memoized; the
+        dict is shared and must not be modified.
+        """
         # Easyship has a 22 character limit on contact_name
         contact_name = address.name[:22] if len(address.name) > 22 else address.name
 
@@ -70,8 +150,14 @@ class EasyshipClient:
         """
         logger.info("Getting rates from Easyship")
 
+        # Don't hammer the API while it is telling us to back off
+        wait = self._rate_limited_until - time.monotonic()
+        if wait > 0:
+            raise Exception(f"Easyship rate limit in effect, retry in {wait:.0f}s")
+
         # Prepare shipment data for Easyship
         payload = {
+            **self.RATE_REQUEST_DEFAULTS,
             "origin_address": self._address_to_dict(from_address),
             "destination_address": self._address_to_dict(to_address),
             "parcels": [
@@ -82,37 +168,29 @@ class EasyshipClient:
                         "height": parcel.height
                     },
                     "items": [
-                        {
-                            "actual_weight": parcel.weight,
-                            "category": "general",
-                            "declared_currency": "USD",
-                            "declared_customs_value": 50.0,
-                            "description": "Package",
-                            "quantity": 1,
-                            "hs_code": "9999.99.99"  # Generic HS code for unspecified goods
-                        }
+                        {"actual_weight": parcel.weight, **self.RATE_ITEM_DEFAULTS}
                     ]
                 }
             ],
-            "incoterms": "DDU",
-            "insurance": {
-                "is_insured": False
-            }
         }
 
         try:
             # Make API request
-            response = requests.post(
+            response = self.session.post(
                 f"{self.BASE_URL}/rates",
-                json=payload,
-                headers=self.headers,
+                data=orjson.dumps(payload),  # Content-Type is set on the session
                 timeout=30
             )
 
+            if response.status_code == 429:
+                retry_after = self._retry_after_seconds(response)
+                self._rate_limited_until = time.monotonic() + retry_after
+                logger.warning(f"Easyship rate limited, pausing for {retry_after:.0f}s")
+
             if response.status_code != 200:
                 raise Exception(f"Easyship API returned status {response.status_code}: {response.text}")
 
-            data = response.json()
+            data = orjson.loads(response.content)
 
             # Convert to Rate models
             rates = []
@@ -120,20 +198,8 @@ class EasyshipClient:
                 for rate_data in data["rates"]:
                     # Extract courier information
                     service_name = rate_data.get("full_description", rate_data.get("courier_display_name", ""))
-                    courier_name = rate_data.get("courier_name", "")
-
                     # If courier_name is empty, extract from service description
-                    if not courier_name and service_name:
-                        # Try "USPS - " pattern first
-                        if " - " in service_name:
-                            courier_name = service_name.split(" - ")[0].strip()
-                        # Try "FedEx" pattern
-                        elif service_name.startswith("FedEx"):
-                            courier_name = "FedEx"
-                        else:
-                            courier_name = "Unknown"
-                    elif not courier_name:
-                        courier_name = "Unknown"
+                    courier_name = rate_data.get("courier_name", "") or _courier_from_service(service_name or "")
 
                     total_charge = rate_data.get("total_charge", 0)
 
@@ -159,3 +225,8 @@ class EasyshipClient:
         except Exception as e:
             logger.error(f"Easyship error: {str(e)}")
             raise Exception(f"Easyship error: {str(e)}")
+
+    async def get_rates_async(self, from_address: Address, to_address: Address,
+                              parcel: Parcel) -> List[Rate]:
+        """Awaitable get_rates(), so Easyship can be gathered with the other providers"""
+        return await asyncio.to_thread(self.get_rates, from_address, to_address, parcel)
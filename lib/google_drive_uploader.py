@@ -1,10 +1,48 @@
 import os
 import json
 import io
+import tempfile
 from datetime import datetime
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaInMemoryUpload
+import requests
+
+# Uploads larger than this use Drive's resumable protocol
+RESUMABLE_UPLOAD_THRESHOLD = 5 * 1024 * 1024
+
+# Downloaded PDFs larger than this are spooled to /tmp instead of held in
+# memory. Anything smaller is uploaded in one multipart body, which reads it
+# whole anyway, so only files that will go resumable are worth spilling
+PDF_SPOOL_MAX_SIZE = RESUMABLE_UPLOAD_THRESHOLD
+
+
+def download_pdf(url, session=None, timeout=10):
+    """
+    Stream a PDF into a spooled temp file (spills to disk if large)
+
+    Drive uploads need a seekable stream, so the response body can't be
+    handed over directly. Files big enough for a resumable upload spill to
+    disk and are then sent a chunk at a time.
+
+    Args:
+        url (str): PDF location, e.g. a provider's temporary label URL
+        session (requests.Session, optional): Session to reuse connections from
+        timeout (float): Request timeout in seconds
+
+    Returns:
+        SpooledTemporaryFile positioned at the start; the caller closes it
+    """
+    http = session or requests
+    pdf_file = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    try:
+        with http.get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                pdf_file.write(chunk)
+    except Exception:
+        pdf_file.close()
+        raise
+
+    pdf_file.seek(0)
+    return pdf_file
 
 
 class GoogleDriveUploader:
@@ -13,6 +51,11 @@ class GoogleDriveUploader:
     """
 
     def __init__(self):
+        # The Google client libraries are slow to import, so only pay for them
+        # once an uploader is actually needed
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
         # Service account credentials from environment variable
         creds_json = os.environ.get('GOOGLE_SERVICE_ACCOUNT_JSON')
         if not creds_json:
@@ -23,17 +66,35 @@ class GoogleDriveUploader:
             creds_dict,
             scopes=['https://www.googleapis.com/auth/drive.file']
         )
-        self.service = build('drive', 'v3', credentials=self.creds)
+
+        # Use the discovery document bundled with googleapiclient instead of
+        # fetching it, and skip the discovery file cache since each container
+        # builds the service only once
+        self.service = build(
+            'drive', 'v3',
+            credentials=self.creds,
+            cache_discovery=False,
+            static_discovery=True
+        )
 
         # Get folder ID from environment
         self.folder_id = os.environ.get('GOOGLE_DRIVE_FOLDER_ID')
 
+        # Monthly folder IDs by YYYY-MM name; a month's folder never changes
+        self._monthly_folders = {}
+
+    @staticmethod
+    def _q(value):
+        """Escape a value for use inside a quoted Drive query string"""
+        return str(value).replace('\\', '\\\\').replace("'", "\\'")
+
     def upload_label(self, pdf_content, tracking_number, carrier, to_name, service_name=None):
         """
         Upload shipping label PDF to Google Drive
 
         Args:
-            pdf_content (bytes): PDF bytes from shipping provider
+            pdf_content (bytes or file-like): PDF bytes, or a readable binary
+                stream positioned at the start of the PDF
             tracking_number (str): Tracking number for filename
             carrier (str): Carrier name (USPS, FedEx, etc)
             to_name (str): Recipient name for organization
@@ -69,12 +130,28 @@ class GoogleDriveUploader:
         if self.folder_id:
             file_metadata['parents'] = [self.folder_id]
 
-        # Upload file
-        media = MediaInMemoryUpload(
-            io.BytesIO(pdf_content),
-            mimetype='application/pdf',
-            resumable=True
-        )
+        from googleapiclient.http import MediaInMemoryUpload, MediaIoBaseUpload
+
+        # Labels are small, so send them as one multipart request; only large
+        # files are worth the extra round-trip to open a resumable session
+        if hasattr(pdf_content, 'read'):
+            # Resumable uploads read the stream a chunk at a time; a multipart
+            # upload reads it whole into the request body
+            size = pdf_content.seek(0, io.SEEK_END)
+            pdf_content.seek(0)
+            media = MediaIoBaseUpload(
+                pdf_content,
+                mimetype='application/pdf',
+                chunksize=256 * 1024,
+                resumable=size > RESUMABLE_UPLOAD_THRESHOLD
+            )
+        else:
+            media = MediaInMemoryUpload(
+                pdf_content,
+                mimetype='application/pdf',
+                chunksize=256 * 1024,
+                resumable=len(pdf_content) > RESUMABLE_UPLOAD_THRESHOLD
+            )
 
         file = self.service.files().create(
             body=file_metadata,
@@ -82,10 +159,13 @@ class GoogleDriveUploader:
             fields='id,webViewLink,webContentLink,name'
         ).execute()
 
-        # Make file shareable (view-only for anyone with link)
+        # Make file shareable (view-only for anyone with link). This has to be
+        # a separate call: it needs the new file's ID, and Drive batch requests
+        # can't carry the media upload that creates it
         self.service.permissions().create(
             fileId=file['id'],
-            body={'type': 'anyone', 'role': 'reader'}
+            body={'type': 'anyone', 'role': 'reader'},
+            fields='id'
         ).execute()
 
         return {
@@ -95,6 +175,31 @@ class GoogleDriveUploader:
             'name': file['name']
         }
 
+    def upload_label_from_url(self, label_url, tracking_number, carrier, to_name,
+                              service_name=None, session=None):
+        """
+        Download a label PDF and upload it to Google Drive
+
+        The PDF is streamed through a spooled temp file (see download_pdf), so
+        it is never held in memory as a whole.
+
+        Args:
+            label_url (str): Provider's label PDF URL
+            session (requests.Session, optional): Session for the download
+            Other arguments as for upload_label()
+
+        Returns:
+            dict: As returned by upload_label()
+        """
+        with download_pdf(label_url, session=session) as pdf_file:
+            return self.upload_label(
+                pdf_content=pdf_file,
+                tracking_number=tracking_number,
+                carrier=carrier,
+                to_name=to_name,
+                service_name=service_name
+            )
+
     def create_monthly_folder(self):
         """
         Create or get folder for current month
@@ -102,10 +207,13 @@ class GoogleDriveUploader:
         """
         folder_name = datetime.now().strftime('%Y-%m')
 
+        if folder_name in self._monthly_folders:
+            return self._monthly_folders[folder_name]
+
         # Check if folder exists
-        query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        query = f"name='{self._q(folder_name)}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
         if self.folder_id:
-            query += f" and '{self.folder_id}' in parents"
+            query += f" and '{self._q(self.folder_id)}' in parents"
 
         results = self.service.files().list(
             q=query,
@@ -116,7 +224,7 @@ class GoogleDriveUploader:
         folders = results.get('files', [])
 
         if folders:
-            return folders[0]['id']
+            folder_id = folders[0]['id']
         else:
             # Create new folder
             file_metadata = {
@@ -132,37 +240,53 @@ class GoogleDriveUploader:
                 fields='id'
             ).execute()
 
-            return folder['id']
+            folder_id = folder['id']
+
+        self._monthly_folders[folder_name] = folder_id
+        return folder_id
 
-    def search_labels(self, tracking_number=None, date_from=None):
+    def search_labels(self, tracking_number=None, date_from=None, include_properties=False):
         """
         Search for labels in Drive
 
+        Results are fetched a page at a time as they are consumed, so callers
+        can stop early without downloading every match.
+
         Args:
             tracking_number (str, optional): Search by tracking number
             date_from (str, optional): Search labels from date (YYYY-MM-DD)
+            include_properties (bool): Also return each file's custom properties
 
-        Returns:
-            list: List of matching files
+        Yields:
+            dict: Matching files, newest first
         """
         query_parts = ["mimeType='application/pdf'", "trashed=false"]
 
         if self.folder_id:
-            query_parts.append(f"'{self.folder_id}' in parents")
+            query_parts.append(f"'{self._q(self.folder_id)}' in parents")
 
         if tracking_number:
-            query_parts.append(f"properties has {{ key='tracking_number' and value='{tracking_number}' }}")
+            query_parts.append(f"properties has {{ key='tracking_number' and value='{self._q(tracking_number)}' }}")
 
         if date_from:
-            query_parts.append(f"createdTime >= '{date_from}T00:00:00'")
+            query_parts.append(f"createdTime >= '{self._q(date_from)}T00:00:00'")
 
         query = " and ".join(query_parts)
 
-        results = self.service.files().list(
+        # Only ask Drive for the fields the caller will use
+        file_fields = 'id,name,webViewLink,createdTime'
+        if include_properties:
+            file_fields += ',properties'
+
+        files = self.service.files()
+        request = files.list(
             q=query,
-            fields='files(id, name, webViewLink, createdTime, properties)',
+            fields=f'nextPageToken,files({file_fields})',
             orderBy='createdTime desc',
-            pageSize=50
-        ).execute()
+            pageSize=100
+        )
 
-        return results.get('files', [])
+        while request is not None:
+            response = request.execute()
+            yield from response.get('files', [])
+            request = files.list_next(request, response)
@@ -0,0 +1,49 @@
+"""Process-wide HTTP session shared by the provider clients and label downloads"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One session for every provider host, so clients share a single set of
+# connection pools (and file descriptors) instead of opening their own.
+# Nothing client-specific lives on it: API keys are sent per request
+SESSION = requests.Session()
+
+# ShipEngine rate, carrier and validation calls are read-only, so POSTs are
+# retried too, but only briefly: the rates fan-out gives up after
+# PROVIDER_TIMEOUT. A read timeout has already used the whole budget, and a
+# 429 is returned straight away; ShipEngineClient then pauses for its
+# Retry-After instead of sleeping it out here
+SESSION.mount("https://api.shipengine.com", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=2,
+        read=0,
+        backoff_factor=0.3,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        raise_on_status=False,
+    ),
+))
+
+# Buying a label is not safe to repeat: a 5xx may arrive after the label was
+# created. Only retry connections that never reached the API
+SESSION.mount("https://api.shipengine.com/v1/labels", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, read=0, status=0, backoff_factor=0.3),
+))
+
+# The Shippo SDK applies its own retry policy
+SESSION.mount("https://api.goshippo.com", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=20,
+))
+
+# Everything else, i.e. label PDF downloads from provider CDNs. The pool is
+# big enough that no download_labels() worker waits for a connection
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+))
@@ -1,11 +1,14 @@
 """Data models for Shippo Tool"""
 
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, Tuple
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 class Address(BaseModel):
     """Shipping address model"""
+    # Frozen so addresses are hashable and client dict conversions can be cached
+    model_config = ConfigDict(frozen=True)
+
     name: str
     street1: str
     street2: Optional[str] = None
@@ -17,8 +20,27 @@ class Address(BaseModel):
     email: Optional[str] = None
     is_residential: bool = True
 
+    def normalized_key(self) -> tuple:
+        """
+        Case- and whitespace-insensitive identity of the physical location
+
+        Contact details (name, phone, email) are left out, so the same place
+        gives the same key whoever is shipping there.
+        """
+        return (
+            self.street1.strip().lower(),
+            (self.street2 or "").strip().lower(),
+            self.city.strip().lower(),
+            self.state.strip().upper(),
+            self.zip.strip(),
+            self.country.strip().upper(),
+            self.is_residential,
+        )
+
 class Parcel(BaseModel):
     """Package dimensions and weight"""
+    model_config = ConfigDict(frozen=True)
+
     length: float
     width: float
     height: float
@@ -28,6 +50,8 @@ class Parcel(BaseModel):
 
 class Rate(BaseModel):
     """Shipping rate from carrier"""
+    model_config = ConfigDict(frozen=True)
+
     object_id: str
     provider: str  # USPS, UPS, FedEx
     servicelevel_name: str
@@ -44,6 +68,8 @@ class Rate(BaseModel):
 
 class ShippingLabel(BaseModel):
     """Generated shipping label"""
+    model_config = ConfigDict(frozen=True)
+
     tracking_number: str
     label_url: str
     carrier: str
@@ -54,7 +80,46 @@ class ShippingLabel(BaseModel):
 
 class ValidationResult(BaseModel):
     """Address validation result"""
+    # Frozen, with messages as a tuple, so results are hashable and can be
+    # shared from the validation caches
+    model_config = ConfigDict(frozen=True)
+
     is_valid: bool
-    messages: List[str] = Field(default_factory=list)
+    messages: Tuple[str, ...] = ()
     original_address: Address
     validated_address: Optional[Address] = None
+
+    def for_address(self, address: Address) -> "ValidationResult":
+        """Copy of this result for another address at the same location"""
+        validated = self.validated_address
+        if validated is not None:
+            validated = validated.model_copy(update={
+                "name": address.name,
+                "phone": address.phone,
+                "email": address.email,
+            })
+
+        return self.model_copy(update={
+            "original_address": address,
+            "validated_address": validated,
+        })
+
+class RatesRequest(BaseModel):
+    """Body of POST /api/rates"""
+    from_address: Address
+    to_address: Address
+    parcel: Parcel
+
+class ValidateRequest(BaseModel):
+    """Body of POST /api/validate"""
+    address: Address
+    provider: str = "auto"
+
+class PurchaseRequest(BaseModel):
+    """Body of POST /api/purchase"""
+    rate_id: Optional[str] = None
+    shipment_id: Optional[str] = None  # Lets EasyPost buy without looking the rate up
+    provider: Optional[str] = None
+    format: Optional[str] = None
+    from_address: Dict[str, Any] = Field(default_factory=dict)  # Echoed back as sent
+    to_address: Dict[str, Any] = Field(default_factory=dict)
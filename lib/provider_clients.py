@@ -0,0 +1,43 @@
+"""Per-process provider client instances shared by the API handlers"""
+
+import os
+from functools import lru_cache
+
+from shippo_client import ShippoClient
+from easypost_client import EasyPostClient
+from shipengine_client import ShipEngineClient
+from easyship_client import EasyshipClient
+
+
+@lru_cache(maxsize=None)
+def get_shippo_client() -> ShippoClient:
+    """Shippo client, built once per warm container"""
+    return ShippoClient(
+        api_key=os.environ['SHIPPO_API_KEY'],
+        test_mode=os.environ.get('SHIPPO_TEST_MODE', 'true').lower() == 'true'
+    )
+
+
+@lru_cache(maxsize=None)
+def get_easypost_client() -> EasyPostClient:
+    """EasyPost client, built once per warm container"""
+    return EasyPostClient(
+        api_key=os.environ['EASYPOST_API_KEY'],
+        test_mode=os.environ.get('EASYPOST_TEST_MODE', 'true').lower() == 'true'
+    )
+
+
+@lru_cache(maxsize=None)
+def get_shipengine_client() -> ShipEngineClient:
+    """ShipEngine client, built once per warm container"""
+    return ShipEngineClient(
+        api_key=os.environ['SHIPENGINE_API_KEY']
+    )
+
+
+@lru_cache(maxsize=None)
+def get_easyship_client() -> EasyshipClient:
+    """Easyship client, built once per warm container"""
+    return EasyshipClient(
+        api_key=os.environ['EASYSHIP_API_KEY']
+    )
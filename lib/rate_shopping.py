@@ -0,0 +1,42 @@
+"""Concurrent rate shopping across provider clients"""
+
+import asyncio
+from typing import Dict, List, Union
+import logging
+from .models import Address, Parcel, Rate
+
+logger = logging.getLogger(__name__)
+
+async def gather_rates(clients: Dict[str, object], from_address: Address, to_address: Address,
+                       parcel: Parcel, timeout: float = 8) -> Dict[str, Union[List[Rate], BaseException]]:
+    """
+    Get rates from several providers at once
+
+    Wall-clock time is that of the slowest provider rather than the sum.
+
+    Args:
+        clients: Provider name -> client exposing get_rates_async()
+        from_address: Sender address
+        to_address: Recipient address
+        parcel: Package dimensions and weight
+        timeout: Seconds to wait for each provider
+
+    Returns:
+        Provider name -> list of rates, or the exception that provider raised
+        (asyncio.TimeoutError if it did not answer in time)
+    """
+    names = list(clients)
+
+    results = await asyncio.gather(
+        *(
+            asyncio.wait_for(clients[name].get_rates_async(from_address, to_address, parcel), timeout)
+            for name in names
+        ),
+        return_exceptions=True,
+    )
+
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"{name} rates failed: {result!r}")
+
+    return dict(zip(names, results))
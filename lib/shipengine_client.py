@@ -1,26 +1,59 @@
 """ShipEngine API client wrapper using REST API"""
 
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import batched
 import os
+import time
+import orjson
 import requests
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import logging
 from .models import Address, Parcel, Rate, ShippingLabel, ValidationResult
+from .cache import TTLCache, ValidationCache
+from .http_session import SESSION
 
 logger = logging.getLogger(__name__)
 
+# How long a fetched carrier list is trusted (seconds); carriers are only
+# connected or removed by hand, so an hour of staleness is harmless
+CARRIER_CACHE_TTL = 60 * 60
+
+# Carrier ID lists by API key hash, shared by every client in the process
+_carrier_cache = TTLCache(maxsize=16, ttl=CARRIER_CACHE_TTL)
+
+# Carrier lists are also kept on disk so a fresh process skips /carriers
+CARRIER_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "shipengine"
+)
+
 class ShipEngineClient:
     """Wrapper around ShipEngine REST API"""
 
     BASE_URL = "https://api.shipengine.com/v1"
 
-    def __init__(self, api_key: Optional[str] = None):
+    # Most addresses sent in one validation request
+    MAX_VALIDATION_BATCH = 100
+
+    # Back-off after a 429 that carries no usable Retry-After header (seconds)
+    DEFAULT_RATE_LIMIT_PAUSE = 30.0
+
+    def __init__(self, api_key: Optional[str] = None, prefetch_carriers: bool = True):
         """
         Initialize ShipEngine client
 
         Args:
             api_key: ShipEngine API key (defaults to SHIPENGINE_API_KEY env var)
+            prefetch_carriers: Look up connected carriers and send their IDs
+                with each rate request. Set False to send empty rate_options
+                and let ShipEngine pick carriers, skipping /carriers entirely;
+                only for accounts where the API accepts that
         """
         self.api_key = api_key or os.getenv("SHIPENGINE_API_KEY", "")
+        self.prefetch_carriers = prefetch_carriers
 
         if not self.api_key:
             raise ValueError("ShipEngine API key not configured. Set SHIPENGINE_API_KEY in .env file")
@@ -30,45 +63,127 @@ class ShipEngineClient:
             "Content-Type": "application/json"
         }
 
-        # Cache carrier IDs after first fetch
-        self._carrier_ids: Optional[List[str]] = None
+        # Shared process-wide session (see http_session for its retry
+        # policy); the API key goes in each request's headers
+        self.session = SESSION
+
+        # Carrier ID caches are keyed by a hash so the key itself isn't stored
+        self._api_key_hash = hashlib.sha256(self.api_key.encode()).hexdigest()[:16]
+
+        # Validation results by location, reused for a day
+        self._validation_cache = ValidationCache(maxsize=512)
+
+        # Monotonic time before which calls fail fast after a 429
+        self._rate_limited_until = 0.0
 
         logger.info("Initialized ShipEngine client")
 
+    def _retry_after_seconds(self, response) -> float:
+        """Seconds to back off after a 429, from Retry-After when it is numeric"""
+        try:
+            return max(float(response.headers.get("Retry-After", "")), 1.0)
+        except ValueError:
+            return self.DEFAULT_RATE_LIMIT_PAUSE
+
+    def _check_rate_limit(self) -> None:
+        """Raise instead of calling the API while a 429 back-off is in effect"""
+        wait = self._rate_limited_until - time.monotonic()
+        if wait > 0:
+            raise Exception(f"ShipEngine rate limit in effect, retry in {wait:.0f}s")
+
+    def _note_rate_limit(self, response) -> None:
+        """Start a back-off if the API answered 429"""
+        if response.status_code == 429:
+            retry_after = self._retry_after_seconds(response)
+            self._rate_limited_until = time.monotonic() + retry_after
+            logger.warning(f"ShipEngine rate limited, pausing for {retry_after:.0f}s")
+
     def _get_carrier_ids(self) -> List[str]:
         """
         Get list of connected carrier IDs
 
+        Cached in memory and on disk for CARRIER_CACHE_TTL, so only the first
+        call per hour pays for the /carriers round trip.
+
         Returns:
             List of carrier IDs
         """
-        if self._carrier_ids is not None:
-            return self._carrier_ids
+        carrier_ids = _carrier_cache.get(self._api_key_hash)
+        if carrier_ids is not None:
+            return carrier_ids
+
+        carrier_ids = self._read_carrier_cache_file()
+        if carrier_ids is not None:
+            _carrier_cache.set(self._api_key_hash, carrier_ids)
+            return carrier_ids
 
         try:
-            response = requests.get(
+            self._check_rate_limit()
+            response = self.session.get(
                 f"{self.BASE_URL}/carriers",
                 headers=self.headers,
                 timeout=30
             )
+            self._note_rate_limit(response)
 
             if response.status_code != 200:
                 logger.warning(f"Failed to fetch carriers: {response.status_code}")
                 return []
 
-            data = response.json()
+            data = orjson.loads(response.content)
             carriers = data.get("carriers", [])
-            self._carrier_ids = [c["carrier_id"] for c in carriers if c.get("carrier_id")]
+            carrier_ids = [c["carrier_id"] for c in carriers if c.get("carrier_id")]
+
+            # An empty list usually means carriers are still being set up,
+            # so keep asking rather than remembering it
+            if carrier_ids:
+                _carrier_cache.set(self._api_key_hash, carrier_ids)
+                self._write_carrier_cache_file(carrier_ids)
 
-            logger.info(f"Found {len(self._carrier_ids)} connected carriers")
-            return self._carrier_ids
+            logger.info(f"Found {len(carrier_ids)} connected carriers")
+            return carrier_ids
 
         except Exception as e:
             logger.warning(f"Failed to fetch carrier IDs: {str(e)}")
             return []
 
-    def _address_to_dict(self, address: Address) -> dict:
-        """Convert Address model to dict for ShipEngine API"""
+    def _carrier_cache_path(self) -> str:
+        """Disk cache file for this API key's carrier IDs"""
+        return os.path.join(CARRIER_CACHE_DIR, f"carriers-{self._api_key_hash}.json")
+
+    def _read_carrier_cache_file(self) -> Optional[List[str]]:
+        """Carrier IDs from the disk cache, or None if missing or expired"""
+        try:
+            with open(self._carrier_cache_path(), "rb") as f:
+                cached = orjson.loads(f.read())
+
+            if time.time() - cached["fetched_at"] < CARRIER_CACHE_TTL:
+                return cached["carrier_ids"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        return None
+
+    def _write_carrier_cache_file(self, carrier_ids: List[str]) -> None:
+        """Save carrier IDs to the disk cache; failures only cost a refetch"""
+        path = self._carrier_cache_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(CARRIER_CACHE_DIR, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps({"fetched_at": time.time(), "carrier_ids": carrier_ids}))
+            # Replace in one step so a concurrent reader never sees half a file
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"Could not write carrier cache: {str(e)}")
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _address_to_dict(address: Address) -> dict:
+        """
+        Convert Address model to dict for ShipEngine API (memoized, treat as read-only)
+        """
         result = {
             "name": address.name,
             "address_line1": address.street1,
@@ -98,21 +213,44 @@ class ShipEngineClient:
         Returns:
             List of available rates
         """
-        logger.info("Getting rates from ShipEngine")
+        return self.get_rates_multi(from_address, to_address, [parcel])
 
-        # Get carrier IDs (required by ShipEngine API)
-        carrier_ids = self._get_carrier_ids()
-        if not carrier_ids:
-            logger.warning("No carriers found or configured")
-            return []
+    def get_rates_multi(self, from_address: Address, to_address: Address,
+                        parcels: List[Parcel]) -> List[Rate]:
+        """
+        Get shipping rates for a multi-package shipment in one request
+
+        Quoting all packages together costs a single round trip, where
+        calling get_rates() per parcel costs one each.
+
+        Args:
+            from_address: Sender address
+            to_address: Recipient address
+            parcels: Dimensions and weight of each package
+
+        Returns:
+            List of available rates, each covering every package
+        """
+        logger.info(f"Getting rates from ShipEngine for {len(parcels)} package(s)")
+
+        # Don't hammer the API while it is telling us to back off
+        self._check_rate_limit()
+
+        # Get carrier IDs (required by ShipEngine API unless the caller opted
+        # out with prefetch_carriers=False)
+        rate_options = {}
+        if self.prefetch_carriers:
+            carrier_ids = self._get_carrier_ids()
+            if not carrier_ids:
+                logger.warning("No carriers found or configured")
+                return []
+            rate_options["carrier_ids"] = carrier_ids
 
         # Prepare shipment data for ShipEngine API
         # According to ShipEngine docs: POST /v1/rates requires "shipment" wrapper
         # and "rate_options" with carrier_ids
         payload = {
-            "rate_options": {
-                "carrier_ids": carrier_ids
-            },
+            "rate_options": rate_options,
             "shipment": {
                 "ship_to": self._address_to_dict(to_address),
                 "ship_from": self._address_to_dict(from_address),
@@ -129,35 +267,39 @@ class ShipEngineClient:
                             "unit": "inch"
                         }
                     }
+                    for parcel in parcels
                 ]
             }
         }
 
         try:
             # Make API request
-            response = requests.post(
+            response = self.session.post(
                 f"{self.BASE_URL}/rates",
-                json=payload,
                 headers=self.headers,
+                data=orjson.dumps(payload),
                 timeout=30
             )
+            self._note_rate_limit(response)
 
             if response.status_code != 200:
                 raise Exception(f"ShipEngine API returned status {response.status_code}: {response.text}")
 
-            data = response.json()
+            data = orjson.loads(response.content)
 
             # Convert to Rate models
             rates = []
             if "rate_response" in data and "rates" in data["rate_response"]:
                 for rate_data in data["rate_response"]["rates"]:
+                    shipping_amount = rate_data.get("shipping_amount") or {}
+
                     rate = Rate(
                         object_id=rate_data.get("rate_id", ""),
                         provider=rate_data.get("carrier_friendly_name", "Unknown"),
                         servicelevel_name=rate_data.get("service_type", ""),
                         servicelevel_token=rate_data.get("service_code", ""),
-                        amount=float(rate_data.get("shipping_amount", {}).get("amount", 0)),
-                        currency=rate_data.get("shipping_amount", {}).get("currency", "USD"),
+                        amount=float(shipping_amount.get("amount", 0)),
+                        currency=shipping_amount.get("currency", "USD"),
                         estimated_days=rate_data.get("estimated_delivery_days", None),
                         duration_terms=None,
                         shipment_id=None,
@@ -174,6 +316,32 @@ class ShipEngineClient:
             logger.error(f"ShipEngine error: {str(e)}")
             raise Exception(f"ShipEngine error: {str(e)}")
 
+    def get_rates_batch(self, shipments: List[Tuple[Address, Address, Parcel]],
+                        max_workers: int = 8) -> List[List[Rate]]:
+        """
+        Get shipping rates for several independent shipments at once
+
+        Requests run concurrently on the client's pooled session, so the batch
+        takes about as long as its slowest quote.
+
+        Args:
+            shipments: (from_address, to_address, parcel) for each shipment
+            max_workers: Requests to run at the same time
+
+        Returns:
+            Rates for each shipment, in the same order
+        """
+        if not shipments:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(shipments))) as executor:
+            return list(executor.map(lambda shipment: self.get_rates(*shipment), shipments))
+
+    async def get_rates_async(self, from_address: Address, to_address: Address,
+                              parcel: Parcel) -> List[Rate]:
+        """Awaitable get_rates(); the ShipEngine request runs in asyncio's thread pool"""
+        return await asyncio.to_thread(self.get_rates, from_address, to_address, parcel)
+
     def purchase_label(self, rate_id: str, label_format: str = "pdf") -> ShippingLabel:
         """
         Purchase shipping label using a rate ID
@@ -196,25 +364,28 @@ class ShipEngineClient:
 
         try:
             # Make API request to purchase label
-            response = requests.post(
+            response = self.session.post(
                 f"{self.BASE_URL}/labels/rates/{rate_id}",
-                json=payload,
                 headers=self.headers,
+                data=orjson.dumps(payload),
                 timeout=30
             )
 
             if response.status_code not in [200, 201]:
                 raise Exception(f"ShipEngine API returned status {response.status_code}: {response.text}")
 
-            data = response.json()
+            data = orjson.loads(response.content)
 
             # Extract label information
+            label_download = data.get("label_download") or {}
+            shipment_cost = data.get("shipment_cost") or {}
+
             label = ShippingLabel(
                 tracking_number=data.get("tracking_number", ""),
-                label_url=data.get("label_download", {}).get("pdf", "") if label_format.lower() == "pdf" else data.get("label_download", {}).get(label_format.lower(), ""),
+                label_url=label_download.get(label_format.lower(), ""),
                 carrier=data.get("carrier_id", "Unknown"),
                 service=data.get("service_code", "Unknown"),
-                cost=float(data.get("shipment_cost", {}).get("amount", 0.0)),
+                cost=float(shipment_cost.get("amount", 0.0)),
             )
 
             logger.info(f"Label created successfully. Tracking: {label.tracking_number}")
@@ -237,86 +408,94 @@ class ShipEngineClient:
         Returns:
             ValidationResult with validation status and corrected address
         """
-        logger.info(f"Validating address in {address.city}, {address.state}")
-
-        # Prepare address validation request
-        # ShipEngine API: POST /v1/addresses/validate
-        payload = [
-            {
-                "address_line1": address.street1,
-                "city_locality": address.city,
-                "state_province": address.state,
-                "postal_code": address.zip,
-                "country_code": address.country,
-            }
-        ]
+        return self.validate_addresses([address])[0]
+
+    def validate_addresses(self, addresses: List[Address]) -> List[ValidationResult]:
+        """
+        Validate and normalize several addresses
+
+        Addresses not already cached are sent MAX_VALIDATION_BATCH at a time,
+        so N addresses cost one round trip per batch rather than N.
+
+        Args:
+            addresses: Addresses to validate
+
+        Returns:
+            ValidationResult for each address, in the same order
+        """
+        results: List[Optional[ValidationResult]] = [None] * len(addresses)
+        pending = []
+
+        for index, address in enumerate(addresses):
+            cached = self._validation_cache.get(address)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append((index, address))
+
+        # Cached results are still served while rate limited
+        if pending:
+            self._check_rate_limit()
+
+        for batch in batched(pending, self.MAX_VALIDATION_BATCH):
+            validated = self._request_validation([address for _, address in batch])
+
+            for (index, address), result in zip(batch, validated):
+                self._validation_cache.set(address, result)
+                results[index] = result
+
+        return results
+
+    def _validation_payload(self, address: Address) -> dict:
+        """Convert Address model to a ShipEngine address validation entry"""
+        entry = {
+            "address_line1": address.street1,
+            "city_locality": address.city,
+            "state_province": address.state,
+            "postal_code": address.zip,
+            "country_code": address.country,
+        }
 
         # Add optional fields
         if address.street2:
-            payload[0]["address_line2"] = address.street2
+            entry["address_line2"] = address.street2
         if address.name:
-            payload[0]["name"] = address.name
+            entry["name"] = address.name
+
+        return entry
+
+    def _request_validation(self, addresses: List[Address]) -> List[ValidationResult]:
+        """Validate up to MAX_VALIDATION_BATCH addresses in one request"""
+        logger.info(f"Validating {len(addresses)} address(es)")
+
+        # ShipEngine API: POST /v1/addresses/validate takes an array and
+        # answers with one result per entry, in order
+        payload = [self._validation_payload(address) for address in addresses]
 
         try:
-            # Make API request to validate address
-            response = requests.post(
+            # Make API request to validate addresses
+            response = self.session.post(
                 f"{self.BASE_URL}/addresses/validate",
-                json=payload,
                 headers=self.headers,
+                data=orjson.dumps(payload),
                 timeout=30
             )
+            self._note_rate_limit(response)
 
             if response.status_code != 200:
                 raise Exception(f"ShipEngine API returned status {response.status_code}: {response.text}")
 
-            data = response.json()
+            data = orjson.loads(response.content)
 
-            # ShipEngine returns an array, get first result
-            if not data or len(data) == 0:
+            if not data:
                 raise Exception("No validation result returned")
+            if len(data) != len(addresses):
+                raise Exception(f"Expected {len(addresses)} validation results, got {len(data)}")
 
-            result_data = data[0]
-
-            # Check validation status
-            status = result_data.get("status", "unverified")
-            is_valid = status in ["verified", "warning"]
-
-            # Extract messages
-            messages = []
-            for msg in result_data.get("messages", []):
-                message_text = msg.get("message", "")
-                if message_text:
-                    messages.append(message_text)
-
-            result = ValidationResult(
-                is_valid=is_valid,
-                messages=messages,
-                original_address=address,
-            )
-
-            # If address was validated or has warnings, create validated address
-            if status in ["verified", "warning"]:
-                matched = result_data.get("matched_address", result_data.get("normalized_address", {}))
-                if matched:
-                    result.validated_address = Address(
-                        name=address.name,
-                        street1=matched.get("address_line1", address.street1),
-                        street2=matched.get("address_line2", "") or "",
-                        city=matched.get("city_locality", address.city),
-                        state=matched.get("state_province", address.state),
-                        zip=matched.get("postal_code", address.zip),
-                        country=matched.get("country_code", address.country),
-                        phone=address.phone,
-                        email=address.email,
-                        is_residential=matched.get("address_residential_indicator") == "yes",
-                    )
-                    logger.info("Address validated successfully")
-                else:
-                    logger.warning(f"Address validation returned status '{status}' but no matched address")
-            else:
-                logger.warning(f"Address validation failed with status: {status}")
-
-            return result
+            return [
+                self._parse_validation(result_data, address)
+                for result_data, address in zip(data, addresses)
+            ]
 
         except requests.exceptions.RequestException as e:
             logger.error(f"ShipEngine address validation error: {str(e)}")
@@ -324,3 +503,47 @@ class ShipEngineClient:
         except Exception as e:
             logger.error(f"ShipEngine error: {str(e)}")
             raise Exception(f"ShipEngine error: {str(e)}")
+
+    def _parse_validation(self, result_data: dict, address: Address) -> ValidationResult:
+        """Convert one ShipEngine validation result into a ValidationResult"""
+        # Check validation status
+        status = result_data.get("status", "unverified")
+        is_valid = status in ["verified", "warning"]
+
+        # Extract messages
+        messages = []
+        for msg in result_data.get("messages", []):
+            message_text = msg.get("message", "")
+            if message_text:
+                messages.append(message_text)
+
+        result = ValidationResult(
+            is_valid=is_valid,
+            messages=messages,
+            original_address=address,
+        )
+
+        # If address was validated or has warnings, create validated address
+        if status in ["verified", "warning"]:
+            matched = result_data.get("matched_address", result_data.get("normalized_address", {}))
+            if matched:
+                # Results are frozen, so attach the address to a copy
+                result = result.model_copy(update={"validated_address": Address(
+                    name=address.name,
+                    street1=matched.get("address_line1", address.street1),
+                    street2=matched.get("address_line2", "") or "",
+                    city=matched.get("city_locality", address.city),
+                    state=matched.get("state_province", address.state),
+                    zip=matched.get("postal_code", address.zip),
+                    country=matched.get("country_code", address.country),
+                    phone=address.phone,
+                    email=address.email,
+                    is_residential=matched.get("address_residential_indicator") == "yes",
+                )})
+                logger.info("Address validated successfully")
+            else:
+                logger.warning(f"Address validation returned status '{status}' but no matched address")
+        else:
+            logger.warning(f"Address validation failed with status: {status}")
+
+        return result
@@ -1,14 +1,30 @@
 """Shippo API client wrapper"""
 
+import asyncio
+from functools import lru_cache
 from shippo import Shippo
 from shippo.models import components
 from typing import Dict, List, Optional
 import logging
 import os
 from .models import Address, Parcel, Rate, ShippingLabel, ValidationResult
+from .cache import ValidationCache
+from .http_session import SESSION
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=8)
+def _get_shippo_sdk(api_key: str, test_mode: bool) -> Shippo:
+    """
+    Shippo SDK instance shared by every ShippoClient with the same key
+
+    Requests go through the process-wide http_session.SESSION, so Shippo
+    shares connection pools with the other REST clients.
+    """
+    return Shippo(api_key_header=api_key, client=SESSION)
+
+
 class ShippoClient:
     """Wrapper around Shippo API"""
 
@@ -27,13 +43,23 @@ class ShippoClient:
             raise ValueError("Shippo API key not configured. Set SHIPPO_API_KEY in .env file")
 
         # Initialize Shippo client with API key
-        self.client = Shippo(api_key_header=self.api_key)
+        self.client = _get_shippo_sdk(self.api_key, self.test_mode)
+
+        # Validation results by location, reused for a day
+        self._validation_cache = ValidationCache(maxsize=512)
 
         mode = "TEST" if self.test_mode else "LIVE"
         logger.info(f"Initialized Shippo client in {mode} mode")
 
-    def _address_to_dict(self, address: Address) -> dict:
-        """Convert Address model to dict for Shippo API"""
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _address_to_dict(address: Address) -> dict:
+        """
+        Convert Address model to dict for Shippo API
+
+        Memoized per address; validate_address() copies it before adding
+        the "validate" flag.
+        """
         return {
             "name": address.name,
             "street1": address.street1,
@@ -47,8 +73,10 @@ class ShippoClient:
             "is_residential": address.is_residential,
         }
 
-    def _parcel_to_dict(self, parcel: Parcel) -> dict:
-        """Convert Parcel model to dict for Shippo API"""
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _parcel_to_dict(parcel: Parcel) -> dict:
+        """Convert Parcel model to dict for Shippo API (cached, don't modify)"""
         return {
             "length": str(parcel.length),
             "width": str(parcel.width),
@@ -95,11 +123,13 @@ class ShippoClient:
         # Convert to Rate models
         rates = []
         for rate_data in shipment.rates:
-            rate = Rate(
+            # The SDK has already validated these into typed models, so build
+            # without re-validating; only the service level fields are optional
+            rate = Rate.model_construct(
                 object_id=rate_data.object_id,
                 provider=rate_data.provider,
-                servicelevel_name=rate_data.servicelevel.name,
-                servicelevel_token=rate_data.servicelevel.token,
+                servicelevel_name=rate_data.servicelevel.name or "",
+                servicelevel_token=rate_data.servicelevel.token or "",
                 amount=float(rate_data.amount),
                 currency=rate_data.currency,
                 estimated_days=rate_data.estimated_days,
@@ -110,6 +140,11 @@ class ShippoClient:
         logger.info(f"Retrieved {len(rates)} rates")
         return rates
 
+    async def get_rates_async(self, from_address: Address, to_address: Address,
+                              parcel: Parcel) -> List[Rate]:
+        """Run get_rates() on a worker thread, for rate_shopping.gather_rates"""
+        return await asyncio.to_thread(self.get_rates, from_address, to_address, parcel)
+
     def purchase_label(self, rate_id: str, label_format: str = "PDF") -> ShippingLabel:
         """
         Purchase shipping label
@@ -169,10 +204,13 @@ class ShippoClient:
         Returns:
             ValidationResult with validation status and corrected address
         """
+        cached = self._validation_cache.get(address)
+        if cached is not None:
+            return cached
+
         logger.info(f"Validating address in {address.city}, {address.state}")
 
-        address_data = self._address_to_dict(address)
-        address_data["validate"] = True
+        address_data = {**self._address_to_dict(address), "validate": True}
 
         address_request = components.AddressCreateRequest(**address_data)
         validated = self.client.addresses.create(address_request)
@@ -187,8 +225,8 @@ class ShippoClient:
         )
 
         if is_valid:
-            # Create validated address from response
-            result.validated_address = Address(
+            # Create validated address from response (results are frozen, so on a copy)
+            result = result.model_copy(update={"validated_address": Address(
                 name=address.name,
                 street1=validated.street1,
                 street2=validated.street2,
@@ -199,11 +237,12 @@ class ShippoClient:
                 phone=address.phone,
                 email=address.email,
                 is_residential=address.is_residential,
-            )
+            )})
             logger.info("Address validated successfully")
         else:
             logger.warning(f"Address validation failed: {result.messages}")
 
+        self._validation_cache.set(address, result)
         return result
 
     def track_shipment(self, carrier: str, tracking_number: str) -> dict:
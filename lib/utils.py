@@ -1,70 +1,156 @@
 """Utility functions"""
 
-import os
+import atexit
+import queue
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from .http_session import SESSION
+
+if TYPE_CHECKING:
+    import numpy
+
+# Set up logging. Callers only put records on a queue; a background thread
+# does the file and console writes, so logging never blocks on disk
+LOG_FILE = Path('logs/shippo_tool.log')
+LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(
+    _log_queue,
+    logging.FileHandler(LOG_FILE),
+    logging.StreamHandler()
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
-# Set up logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/shippo_tool.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
 
 logger = logging.getLogger(__name__)
 
-def download_label(label_url: str, tracking_number: str, output_dir: str = "labels") -> str:
+# Inches per centimetre
+_CM_TO_IN = 1 / 2.54
+
+# Reciprocal of the standard dimensional weight divisor (166) for domestic
+# US shipments, so dimensional weight is a multiply rather than a divide
+_DIM_FACTOR = 1 / 166
+
+class LabelDownloader:
+    """
+    Download shipping label PDFs into one directory
+
+    Build one per batch: the directory is created and the filename timestamp
+    taken once, instead of on every label.
+    """
+
+    def __init__(self, output_dir: str = "labels", session: Optional[requests.Session] = None):
+        """
+        Args:
+            output_dir: Directory to save labels
+            session: Session to reuse connections from (defaults to http_session.SESSION)
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.session = session or SESSION
+        self.timestamp = time.strftime("%Y%m%d_%H%M%S")
+
+    def download(self, label_url: str, tracking_number: str) -> str:
+        """
+        Download shipping label PDF from Shippo URL
+
+        Args:
+            label_url: Temporary URL to label PDF
+            tracking_number: Tracking number for filename
+
+        Returns:
+            Local path to saved label
+        """
+        filepath = self.output_dir / f"{tracking_number}_{self.timestamp}.pdf"
+
+        # Download label, writing each chunk to disk as it arrives rather than
+        # holding the whole file in memory
+        logger.info(f"Downloading label from {label_url}")
+        with self.session.get(label_url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+
+            # Content-Length counts encoded bytes, so it can only be checked
+            # against what we write when the body isn't compressed
+            expected_size = None
+            if 'Content-Encoding' not in response.headers and 'Content-Length' in response.headers:
+                expected_size = int(response.headers['Content-Length'])
+
+            try:
+                written = 0
+                with open(filepath, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        written += f.write(chunk)
+
+                if expected_size is not None and written != expected_size:
+                    raise IOError(f"Label download incomplete: got {written} of {expected_size} bytes")
+            except Exception:
+                # Don't leave a truncated label behind
+                filepath.unlink(missing_ok=True)
+                raise
+
+        logger.info(f"Label saved to {filepath}")
+        return str(filepath)
+
+def download_label(label_url: str, tracking_number: str, output_dir: str = "labels",
+                   session: Optional[requests.Session] = None) -> str:
     """
     Download shipping label PDF from Shippo URL
 
+    One-off wrapper around LabelDownloader; use a LabelDownloader (or
+    download_labels()) directly for batches.
+
     Args:
         label_url: Temporary URL to label PDF
         tracking_number: Tracking number for filename
         output_dir: Directory to save label
+        session: Session to reuse connections from (defaults to http_session.SESSION)
 
     Returns:
         Local path to saved label
     """
-    # Ensure output directory exists
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    return LabelDownloader(output_dir, session).download(label_url, tracking_number)
 
-    # Generate filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{tracking_number}_{timestamp}.pdf"
-    filepath = os.path.join(output_dir, filename)
+def download_labels(labels: List[Tuple[str, str]], output_dir: str = "labels",
+                    max_workers: int = 8) -> List[str]:
+    """
+    Download several shipping label PDFs at once
 
-    # Download label
-    logger.info(f"Downloading label from {label_url}")
-    response = requests.get(label_url, timeout=30)
-    response.raise_for_status()
+    Args:
+        labels: (label_url, tracking_number) pairs
+        output_dir: Directory to save labels
+        max_workers: Downloads to run at the same time (at most 16)
 
-    # Save to file
-    with open(filepath, 'wb') as f:
-        f.write(response.content)
+    Returns:
+        Local paths to saved labels, in the same order as labels
+    """
+    if not labels:
+        return []
 
-    logger.info(f"Label saved to {filepath}")
-    return filepath
+    downloader = LabelDownloader(output_dir)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, 16, len(labels))) as executor:
+        return list(executor.map(lambda label: downloader.download(*label), labels))
 
 def format_address_for_display(address: dict) -> str:
     """Format address for pretty printing"""
-    lines = [
-        address.get('name', ''),
-        address.get('street1', ''),
-    ]
-    if address.get('street2'):
-        lines.append(address['street2'])
-
-    city_line = f"{address.get('city', '')}, {address.get('state', '')} {address.get('zip', '')}"
-    lines.append(city_line)
-    lines.append(address.get('country', 'US'))
+    get = address.get
+    city_line = f"{get('city', '')}, {get('state', '')} {get('zip', '')}"
 
-    return '\n'.join(filter(None, lines))
+    # Blank lines (no name, street2, etc.) are left out
+    lines = (get('name', ''), get('street1', ''), get('street2'), city_line, get('country', 'US'))
+    return '\n'.join([line for line in lines if line])
 
 def calculate_dimensional_weight(length: float, width: float, height: float,
                                  unit: str = "in") -> float:
@@ -80,17 +166,58 @@ def calculate_dimensional_weight(length: float, width: float, height: float,
     """
     if unit == "cm":
         # Convert to inches
-        length = length / 2.54
-        width = width / 2.54
-        height = height / 2.54
+        length *= _CM_TO_IN
+        width *= _CM_TO_IN
+        height *= _CM_TO_IN
 
-    # Standard divisor for domestic US shipments
-    dim_weight = (length * width * height) / 166
+    dim_weight = length * width * height * _DIM_FACTOR
     return round(dim_weight, 2)
 
+def calculate_dimensional_weight_bulk(length, width, height, unit: str = "in") -> "numpy.ndarray":
+    """
+    Calculate dimensional weight for many packages at once
+
+    Vectorized version of calculate_dimensional_weight() for bulk imports,
+    where a Python loop per row would dominate. Needs NumPy, which is only
+    imported when this is called.
+
+    Uses the same operations in the same order as the scalar function, but
+    np.round() rounds the scaled value half to even where round() is exact,
+    so a weight that lands on a half-cent can come out 0.01 apart.
+
+    Args:
+        length, width, height: Package dimensions (arrays or lists of equal length)
+        unit: "in" (inches) or "cm" (centimeters)
+
+    Returns:
+        Array of dimensional weights in pounds
+    """
+    import numpy as np
+
+    length = np.asarray(length, dtype=np.float64)
+    width = np.asarray(width, dtype=np.float64)
+    height = np.asarray(height, dtype=np.float64)
+
+    if unit == "cm":
+        # Convert to inches
+        length = length * _CM_TO_IN
+        width = width * _CM_TO_IN
+        height = height * _CM_TO_IN
+
+    return np.round(length * width * height * _DIM_FACTOR, 2)
+
 def validate_zip_code(zip_code: str) -> bool:
     """Validate US ZIP code format"""
-    import re
-    # 5 digits or 5+4 format
-    pattern = r'^\d{5}(-\d{4})?$'
-    return bool(re.match(pattern, zip_code))
+    # 5 digits or 5+4 format, ASCII digits only. The earlier \d regex also
+    # accepted other Unicode digits (e.g. full-width '１２３４５'); those are
+    # now rejected, which isdigit() alone would not do
+    if not zip_code.isascii():
+        return False
+    if len(zip_code) == 5:
+        return zip_code.isdigit()
+    return (
+        len(zip_code) == 10
+        and zip_code[5] == '-'
+        and zip_code[:5].isdigit()
+        and zip_code[6:].isdigit()
+    )
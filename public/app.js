@@ -592,7 +592,7 @@ const ShippingApp = {
                             html += `
                                 <div class="rate-cell">
                                     <span class="rate-price">$${parseFloat(baseRate.amount).toFixed(2)}</span>
-                                    <button class="btn btn-sm btn-primary ms-2" onclick="ShippingApp.purchaseLabel('${baseRate.object_id}', '${provider}', false)">Buy</button>
+                                    <button class="btn btn-sm btn-primary ms-2" onclick="ShippingApp.purchaseLabel('${baseRate.object_id}', '${provider}', false, '${baseRate.shipment_id || ''}')">Buy</button>
                                 </div>`;
                         } else {
                             html += '<span class="text-muted">N/A</span>';
@@ -622,13 +622,13 @@ const ShippingApp = {
                                         <span class="rate-price">$${displayAmount.toFixed(2)}</span>
                                         ${surchargeNote}
                                     </div>
-                                    <button class="btn btn-sm btn-success ms-2" onclick="ShippingApp.purchaseLabel('${sigRate.object_id}', '${provider}', true)">Buy</button>
+                                    <button class="btn btn-sm btn-success ms-2" onclick="ShippingApp.purchaseLabel('${sigRate.object_id}', '${provider}', true, '${sigRate.shipment_id || ''}')">Buy</button>
                                 </div>`;
                         } else if (sigRate) {
                             html += `
                                 <div class="rate-cell">
                                     <span class="rate-price">$${parseFloat(sigRate.amount).toFixed(2)}</span>
-                                    <button class="btn btn-sm btn-success ms-2" onclick="ShippingApp.purchaseLabel('${sigRate.object_id}', '${provider}', true)">Buy</button>
+                                    <button class="btn btn-sm btn-success ms-2" onclick="ShippingApp.purchaseLabel('${sigRate.object_id}', '${provider}', true, '${sigRate.shipment_id || ''}')">Buy</button>
                                 </div>`;
                         } else {
                             html += '<span class="text-muted">N/A</span>';
@@ -722,7 +722,7 @@ const ShippingApp = {
     },
 
     // Purchase label
-    async purchaseLabel(rateId, provider, signature = false) {
+    async purchaseLabel(rateId, provider, signature = false, shipmentId = '') {
         try {
             const sigText = signature ? ' with signature confirmation' : '';
             const confirmed = confirm(`Purchase this shipping label${sigText}?`);
@@ -732,6 +732,7 @@ const ShippingApp = {
 
             const response = await axios.post(`${this.config.apiUrl}/purchase`, {
                 rate_id: rateId,
+                shipment_id: shipmentId || null,
                 provider: provider,
                 format: 'PDF',
                 from_address: this.state.fromAddress,